@@ -0,0 +1,10 @@
+# Gunicorn settings for FreeCast (used by FMhost_runner)
+bind = "127.0.0.1:5005"
+workers = 3
+# Shows up as "gunicorn: master [fmhost]" (needs setproctitle), FMhost_runner stop matches it
+proc_name = "fmhost"
+wsgi_app = "main:create_app()"
+
+# Run create_app() once in the master (schema setup and cache warm-up),
+# then fork the workers
+preload_app = True
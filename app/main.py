@@ -10,6 +10,7 @@ from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
 from datetime import datetime
+import time
 import pymysql
 from pymysql.cursors import DictCursor
 
@@ -29,23 +30,25 @@ app.config['MYSQL_PASSWORD'] = 'K102030k'
 app.config['MYSQL_DB'] = 'kygnus_video_library'
 app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
 
-# Initialize Flask-Login
+# Flask-Login and Flask-Limiter are bound to the app in create_app()
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
 login_manager.login_message_category = 'error'
-# Initialize Flask-Limiter
 limiter = Limiter(
     get_remote_address,
-    app=app,
     default_limits=["200 per day", "50 per hour"],
     storage_uri="memory://"
 )
 
-# Create necessary directories
-os.makedirs(COVERS_FOLDER, exist_ok=True)
-os.makedirs(THUMBNAILS_FOLDER, exist_ok=True)
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.webm')
+
+# Library index cache: root folder -> (scan time, directory mtimes, sub folders, [(folder, filename), ...])
+_library_index = {}
+# mtimes can miss two changes within one tick on coarse filesystems (FAT/exFAT,
+# some NFS), so a cached listing is never trusted for longer than this
+LIBRARY_INDEX_TTL = 60
+_app_ready = False
 
 # Database connection function
 def get_db_connection():
@@ -312,51 +315,130 @@ def update_video_metadata(video_path, updates):
         print(f"Error updating metadata: {e}")
         return False
 
+def _directory_mtimes(root_folder, folders):
+    return tuple(
+        os.stat(os.path.join(root_folder, folder)).st_mtime_ns
+        for folder in ('',) + tuple(folders)
+    )
+
+def _scan_library(root_folder):
+    # Each directory is stat()ed before it is listed, so a change made
+    # during the scan leaves these mtimes older than the directory's
+    mtimes = [os.stat(root_folder).st_mtime_ns]
+    entries = []
+    folders = []
+    for item in os.listdir(root_folder):
+        item_path = os.path.join(root_folder, item)
+
+        if os.path.isdir(item_path):
+            mtimes.append(os.stat(item_path).st_mtime_ns)
+            folders.append(item)
+            entries.extend((item, subitem) for subitem in os.listdir(item_path)
+                           if subitem.lower().endswith(VIDEO_EXTENSIONS))
+        elif item.lower().endswith(VIDEO_EXTENSIONS):
+            entries.append((None, item))
+
+    return tuple(mtimes), folders, entries
+
+# Cached list of (folder, filename) pairs, rescanned when a directory mtime changes
+def scan_library(root_folder):
+    cached = _library_index.get(root_folder)
+    if cached:
+        scanned_at, mtimes, folders, entries = cached
+        if time.monotonic() - scanned_at < LIBRARY_INDEX_TTL:
+            try:
+                if _directory_mtimes(root_folder, folders) == mtimes:
+                    return entries
+            except OSError:
+                pass
+
+    for _ in range(3):
+        scanned_at = time.monotonic()
+        mtimes, folders, entries = _scan_library(root_folder)
+        try:
+            if _directory_mtimes(root_folder, folders) == mtimes:
+                break
+        except OSError:
+            continue
+    else:
+        # The library kept changing while it was scanned, serve the last
+        # listing without caching it
+        _library_index.pop(root_folder, None)
+        return entries
+
+    _library_index[root_folder] = (scanned_at, mtimes, folders, entries)
+    return entries
+
 def get_video_structure(root_folder):
     video_structure = []
     
     try:
-        for item in os.listdir(root_folder):
-            item_path = os.path.join(root_folder, item)
-            
-            if os.path.isdir(item_path):
-                folder_contents = []
-                for subitem in os.listdir(item_path):
-                    if subitem.lower().endswith(('.mp4', '.avi', '.mkv', '.mov', '.webm')):
-                        video_rel_path = f"{item}/{subitem}"
-                        video_meta = get_video_metadata(video_rel_path)
-                        folder_contents.append({
-                            "name": subitem,
-                            "url": f"/videos/{video_rel_path}",
-                            "cover": video_meta.get('cover_image', '../static/images/video_player.gif'),
-                            "views": video_meta.get('views', 0),
-                            "upload_date": video_meta.get('upload_date', datetime.now().strftime('%Y-%m-%d')),
-                            "duration": video_meta.get('duration', '10:30')
-                        })
-                
-                if folder_contents:
-                    video_structure.append({
+        entries = scan_library(root_folder)
+        # One query for the whole library instead of one per video
+        metadata = load_metadata()
+        folders = {}
+
+        for folder, name in entries:
+            video_rel_path = f"{folder}/{name}" if folder else name
+            video_meta = metadata.get(video_rel_path, {})
+            video = {
+                "name": name,
+                "url": f"/videos/{video_rel_path}",
+                "cover": video_meta.get('cover_image', '../static/images/video_player.gif'),
+                "views": video_meta.get('views', 0),
+                "upload_date": video_meta.get('upload_date', datetime.now().strftime('%Y-%m-%d')),
+                "duration": video_meta.get('duration', '10:30')
+            }
+
+            if folder:
+                if folder not in folders:
+                    folders[folder] = {
                         "type": "folder",
-                        "name": item,
-                        "contents": folder_contents,
-                        "count": len(folder_contents)
-                    })
-            elif item.lower().endswith(('.mp4', '.avi', '.mkv', '.mov', '.webm')):
-                video_meta = get_video_metadata(item)
-                video_structure.append({
-                    "type": "video",
-                    "name": item,
-                    "url": f"/videos/{item}",
-                    "cover": video_meta.get('cover_image', '../static/images/video_player.gif'),
-                    "views": video_meta.get('views', 0),
-                    "upload_date": video_meta.get('upload_date', datetime.now().strftime('%Y-%m-%d')),
-                    "duration": video_meta.get('duration', '10:30')
-                })
+                        "name": folder,
+                        "contents": [],
+                        "count": 0
+                    }
+                    video_structure.append(folders[folder])
+                folders[folder]["contents"].append(video)
+                folders[folder]["count"] += 1
+            else:
+                video["type"] = "video"
+                video_structure.append(video)
     except Exception as e:
         print(f"Error getting video structure: {e}")
     
     return video_structure
 
+# Build the library index and compile templates, logging failures so startup never aborts
+def warm_caches():
+    try:
+        templates = app.jinja_env.list_templates(extensions=['html'])
+    except Exception as e:
+        print(f"Error listing templates: {e}")
+        templates = []
+    for template in templates:
+        try:
+            app.jinja_env.get_template(template)
+        except Exception as e:
+            print(f"Error compiling template {template}: {e}")
+    try:
+        get_video_structure(VIDEO_FOLDER)
+    except Exception as e:
+        print(f"Error warming library index: {e}")
+
+# Application factory, run once in the gunicorn master via preload_app (see gunicorn.conf.py)
+def create_app():
+    global _app_ready
+    if not _app_ready:
+        os.makedirs(COVERS_FOLDER, exist_ok=True)
+        os.makedirs(THUMBNAILS_FOLDER, exist_ok=True)
+        login_manager.init_app(app)
+        limiter.init_app(app)
+        init_db()  # Initialize database tables
+        warm_caches()
+        _app_ready = True
+    return app
+
 def format_views(views):
     if views >= 1000000:
         return f"{views/1000000:.1f}M"
@@ -507,7 +589,7 @@ def upload():
         if new_folder:
             folder = new_folder
         
-        if file and file.filename.lower().endswith(('.mp4', '.avi', '.mkv', '.mov', '.webm')):
+        if file and file.filename.lower().endswith(VIDEO_EXTENSIONS):
             filename = secure_filename(file.filename)
             
             if folder:
@@ -665,5 +747,5 @@ def unauthorized_handler():
 
 
 if __name__ == "__main__":
-    init_db()  # Initialize database tables
+    create_app()
     app.run("0.0.0.0", port=5005, debug=True)
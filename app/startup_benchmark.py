@@ -0,0 +1,145 @@
+"""Measure how long a restart takes to get back to serving requests.
+
+Every run starts gunicorn with gunicorn.conf.py on a free port, the same way
+systemd does after Restart=on-failure, and times it until the first HTTP 200
+from "/". That covers gunicorn boot, create_app() (schema setup and cache
+warm-up), forking the workers and the first response.
+
+    cd app && python startup_benchmark.py --runs 5 --budget 0.5
+
+The default budget is 0.5s, so a restart has to be back to serving in well
+under a second, not just under one.
+
+With --split, one extra probe also shows how that time divides between
+importing main and running create_app().
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.create_app()
+ready = time.perf_counter()
+print(json.dumps({'import': imported - start, 'create_app': ready - imported}))
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_first_response(url, server, timeout):
+    # Returns None once the app answers 200, otherwise why it did not
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            return f"gunicorn exited with code {server.returncode}"
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return None
+                return f"first response was HTTP {response.status}"
+        except urllib.error.HTTPError as e:
+            # The app is up but broken, that is not a slow start
+            return f"first response was HTTP {e.code}"
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.01)
+    return f"no response within {timeout:.0f}s"
+
+
+def run_once(timeout):
+    port = free_port()
+    with tempfile.TemporaryFile(mode="w+") as log:
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+             "-b", f"127.0.0.1:{port}", "-n", "fmhost-benchmark"],
+            cwd=APP_DIR, stdout=log, stderr=subprocess.STDOUT
+        )
+        try:
+            error = wait_for_first_response(f"http://127.0.0.1:{port}/", server, timeout)
+            elapsed = time.perf_counter() - start
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+        if error:
+            log.seek(0)
+            print(log.read(), file=sys.stderr)
+        return elapsed, error
+
+
+def run_split():
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=APP_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        return None
+    # create_app() may print warm-up errors, the timings are the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=positive_int, default=5)
+    parser.add_argument("--budget", type=float, default=0.5,
+                        help="maximum median time to first response in seconds")
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="give up on a run after this many seconds")
+    parser.add_argument("--split", action="store_true",
+                        help="also time importing main and create_app() separately")
+    args = parser.parse_args()
+
+    if args.split:
+        timing = run_split()
+        if timing is None:
+            print("split probe failed")
+            return 1
+        print(f"import main {timing['import']:.3f}s, create_app {timing['create_app']:.3f}s")
+
+    totals = []
+    for i in range(args.runs):
+        elapsed, error = run_once(args.timeout)
+        if error:
+            print(f"run {i + 1}: {error} after {elapsed:.3f}s")
+            return 1
+        totals.append(elapsed)
+        print(f"run {i + 1}: first response after {elapsed:.3f}s")
+
+    median = statistics.median(totals)
+    print(f"median time to first response: {median:.3f}s (budget {args.budget:.3f}s)")
+    return 0 if median <= args.budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())